@@ -3,11 +3,14 @@ Snake game logic with Observer pattern demonstration.
 The GameState is a Subject that notifies Observers (spectators) of updates.
 """
 import sqlite3
+import sys
+import time
+from collections import deque
 from enum import Enum
-from typing import List, Callable, Optional
-from dataclasses import dataclass, asdict
+from typing import Deque, List, Callable, NamedTuple, Optional, Tuple
+from dataclasses import dataclass
 from threading import Lock
-import json
+import orjson
 
 
 class Direction(Enum):
@@ -17,124 +20,202 @@ class Direction(Enum):
     RIGHT = "RIGHT"
 
 
-@dataclass
+# Directions are stored as ints internally and index into these tables;
+# Direction is only used at the API boundary. Opposite directions differ
+# only in the lowest bit, so `a ^ b == 1` means a reversal.
+DIR_UP, DIR_DOWN, DIR_LEFT, DIR_RIGHT = range(4)
+DIR_VECTORS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+_INT_TO_NAME = ("UP", "DOWN", "LEFT", "RIGHT")
+_NAME_TO_INT = {name: i for i, name in enumerate(_INT_TO_NAME)}
+
+
+# slots=True needs Python 3.10+; fall back to a regular dataclass on older versions
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, eq=True, **_SLOTS)
 class Position:
     x: int
     y: int
 
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
-
-    def to_dict(self):
-        return {"x": self.x, "y": self.y}
+    def to_tuple(self):
+        return (self.x, self.y)
 
 
 @dataclass
 class GameState:
     """Represents the current game state"""
-    snake: List[Position]
+    snake: Deque[Position]  # head first; deque for O(1) push/pop at both ends
+    fruit: Position
+    score: int
+    game_over: bool
+    direction: int  # DIR_* constant
+    high_score: int
+
+
+class GameSnapshot(NamedTuple):
+    """Immutable, versioned view of a GameState, safe to share between readers"""
+    version: int
+    snake: Tuple[Position, ...]
     fruit: Position
     score: int
     game_over: bool
-    direction: Direction
+    direction: int
     high_score: int
 
-    def to_dict(self):
-        return {
-            "snake": [pos.to_dict() for pos in self.snake],
-            "fruit": self.fruit.to_dict(),
+    def to_json(self) -> bytes:
+        """Encode as the game_state JSON sent to clients"""
+        # orjson encodes tuples and Position dataclasses natively, so no dicts are built
+        return orjson.dumps({
+            "snake": self.snake,
+            "fruit": self.fruit,
             "score": self.score,
             "game_over": self.game_over,
-            "direction": self.direction.value,
+            "direction": _INT_TO_NAME[self.direction],
             "high_score": self.high_score,
-        }
+        })
 
 
 class GameDatabase:
     """Handles all database operations for game state persistence"""
 
+    # Ticks are buffered and written in one transaction once either limit is hit
+    BATCH_SIZE = 10
+    FLUSH_INTERVAL = 1.0  # seconds
+
+    # Reused verbatim so the connection's prepared-statement cache is hit every time
+    INSERT_SQL = (
+        "INSERT INTO game_state (snake, fruit, score, game_over, direction, high_score) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    )
+    SELECT_LATEST_SQL = (
+        "SELECT snake, fruit, score, game_over, direction, high_score "
+        "FROM game_state ORDER BY id DESC LIMIT 1"
+    )
+
     def __init__(self, db_path: str = "game.db"):
         self.db_path = db_path
         self.lock = Lock()
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
         self._init_db()
 
     def _init_db(self):
-        """Initialize database schema"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS game_state (
-                    id INTEGER PRIMARY KEY,
-                    snake TEXT NOT NULL,
-                    fruit TEXT NOT NULL,
-                    score INTEGER NOT NULL,
-                    game_over INTEGER NOT NULL,
-                    direction TEXT NOT NULL,
-                    high_score INTEGER NOT NULL,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
+        """Open the shared connection and initialize database schema"""
+        # Autocommit mode: transactions are opened explicitly in _flush_locked
+        self.conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-8000")  # 8 MB page cache
+        self.conn.execute(
             """
+            CREATE TABLE IF NOT EXISTS game_state (
+                id INTEGER PRIMARY KEY,
+                snake TEXT NOT NULL,
+                fruit TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                game_over INTEGER NOT NULL,
+                direction TEXT NOT NULL,
+                high_score INTEGER NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
             )
-            conn.commit()
+        """
+        )
+
+    @staticmethod
+    def _encode(state: GameState) -> tuple:
+        """Snapshot a state into an INSERT row"""
+        return (
+            # Decoded so the TEXT columns hold text, not BLOBs, like existing rows
+            orjson.dumps([p.to_tuple() for p in state.snake]).decode(),
+            orjson.dumps(state.fruit.to_tuple()).decode(),
+            state.score,
+            1 if state.game_over else 0,
+            _INT_TO_NAME[state.direction],
+            state.high_score,
+        )
 
-    def save_state(self, state: GameState):
-        """Write game state to database"""
+    @staticmethod
+    def _decode_position(data) -> Position:
+        """Decode a stored [x, y] pair; older databases stored {"x": .., "y": ..} dicts"""
+        if isinstance(data, dict):
+            return Position(data["x"], data["y"])
+        x, y = data
+        return Position(x, y)
+
+    def _flush_locked(self):
+        """Write all buffered rows in a single transaction (caller holds lock)"""
+        if self._pending:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(self.INSERT_SQL, self._pending)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def save_state(self, state: GameState, flush: bool = False):
+        """Buffer game state; written to the database in batches"""
+        row = self._encode(state)
         with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO game_state (snake, fruit, score, game_over, direction, high_score)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        json.dumps([asdict(p) for p in state.snake]),
-                        json.dumps(asdict(state.fruit)),
-                        state.score,
-                        1 if state.game_over else 0,
-                        state.direction.value,
-                        state.high_score,
-                    ),
-                )
-                conn.commit()
+            self._pending.append(row)
+            if (
+                flush
+                or state.game_over
+                or len(self._pending) >= self.BATCH_SIZE
+                or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL
+            ):
+                self._flush_locked()
+
+    def save_state_batch(self, states: List[GameState]):
+        """Write several game states in one transaction"""
+        rows = [self._encode(state) for state in states]
+        with self.lock:
+            self._pending.extend(rows)
+            self._flush_locked()
+
+    def has_pending(self) -> bool:
+        """Whether any buffered states are still waiting to be written"""
+        return bool(self._pending)
+
+    def flush(self):
+        """Write any buffered states to the database"""
+        with self.lock:
+            self._flush_locked()
 
     def get_latest_state(self) -> Optional[GameState]:
         """Read latest game state from database"""
         with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT snake, fruit, score, game_over, direction, high_score
-                    FROM game_state
-                    ORDER BY id DESC
-                    LIMIT 1
-                """
-                )
-                row = cursor.fetchone()
-
-                if not row:
-                    return None
-
-                snake_data = json.loads(row[0])
-                fruit_data = json.loads(row[1])
-                score = row[2]
-                game_over = bool(row[3])
-                direction = Direction(row[4])
-                high_score = row[5]
-
-                snake = [Position(**p) for p in snake_data]
-                fruit = Position(**fruit_data)
-
-                return GameState(
-                    snake=snake,
-                    fruit=fruit,
-                    score=score,
-                    game_over=game_over,
-                    direction=direction,
-                    high_score=high_score,
-                )
+            self._flush_locked()
+            row = self.conn.execute(self.SELECT_LATEST_SQL).fetchone()
+
+            if not row:
+                return None
+
+            snake_data = orjson.loads(row[0])
+            fruit_data = orjson.loads(row[1])
+            score = row[2]
+            game_over = bool(row[3])
+            direction = _NAME_TO_INT[row[4]]
+            high_score = row[5]
+
+            snake = deque([self._decode_position(p) for p in snake_data])
+            fruit = self._decode_position(fruit_data)
+
+            return GameState(
+                snake=snake,
+                fruit=fruit,
+                score=score,
+                game_over=game_over,
+                direction=direction,
+                high_score=high_score,
+            )
 
 
 class SnakeGame:
@@ -147,6 +228,9 @@ class SnakeGame:
         self.db = GameDatabase(db_path)
         self.lock = Lock()
         self.state = self._load_or_create_state()
+        self._sync_occupied()
+        self.version = 0
+        self._publish_state()
         self.observers: List[Callable[[GameState], None]] = []
 
     def _load_or_create_state(self) -> GameState:
@@ -158,14 +242,40 @@ class SnakeGame:
         # Create new game
         high_score = latest.high_score if latest else 0
         return GameState(
-            snake=[Position(10, 10), Position(9, 10), Position(8, 10)],
+            snake=deque([Position(10, 10), Position(9, 10), Position(8, 10)]),
             fruit=Position(15, 15),
             score=0,
             game_over=False,
-            direction=Direction.RIGHT,
+            direction=DIR_RIGHT,
             high_score=high_score,
         )
 
+    def _sync_occupied(self):
+        """Rebuild the occupancy grid from the snake body"""
+        # Flat occupancy grid indexed by y * GRID_WIDTH + x (1 = snake)
+        width = self.GRID_WIDTH
+        grid = bytearray(width * self.GRID_HEIGHT)
+        for p in self.state.snake:
+            grid[p.y * width + p.x] = 1
+        self._grid = grid
+
+    def _publish_state(self):
+        """Bump the version and rebuild the shared snapshot and JSON (caller holds lock)"""
+        self.version += 1
+        state = self.state
+        snapshot = GameSnapshot(
+            version=self.version,
+            snake=tuple(state.snake),
+            fruit=state.fruit,
+            score=state.score,
+            game_over=state.game_over,
+            direction=state.direction,
+            high_score=state.high_score,
+        )
+        self._snapshot = snapshot
+        # Stored as one tuple so readers on other threads never see a mismatched pair
+        self._state_payload = (self.version, snapshot.to_json())
+
     def subscribe(self, observer: Callable[[GameState], None]):
         """Register an observer (spectator)"""
         if observer not in self.observers:
@@ -186,16 +296,13 @@ class SnakeGame:
 
     def set_direction(self, direction: Direction):
         """Set the next direction for the snake"""
+        new_direction = _NAME_TO_INT[direction.value]
         with self.lock:
-            # Prevent reversing into itself
-            opposite = {
-                Direction.UP: Direction.DOWN,
-                Direction.DOWN: Direction.UP,
-                Direction.LEFT: Direction.RIGHT,
-                Direction.RIGHT: Direction.LEFT,
-            }
-            if self.state.direction != opposite[direction]:
-                self.state.direction = direction
+            old_direction = self.state.direction
+            # Ignore repeats (nothing to publish) and reversing into itself
+            if new_direction != old_direction and old_direction ^ new_direction != 1:
+                self.state.direction = new_direction
+                self._publish_state()
 
     def tick(self):
         """Advance game state by one tick"""
@@ -203,47 +310,63 @@ class SnakeGame:
             if self.state.game_over:
                 return
 
+            state = self.state
+            snake = state.snake
+            grid = self._grid
+            width = self.GRID_WIDTH
+
             # Calculate new head position
-            head = self.state.snake[0]
-            dx, dy = self._get_direction_vector(self.state.direction)
-            new_head = Position(head.x + dx, head.y + dy)
+            head = snake[0]
+            dx, dy = DIR_VECTORS[state.direction]
+            x = head.x + dx
+            y = head.y + dy
 
             # Check collision with walls
-            if (
-                new_head.x < 0
-                or new_head.x >= self.GRID_WIDTH
-                or new_head.y < 0
-                or new_head.y >= self.GRID_HEIGHT
-            ):
-                self.state.game_over = True
-                if self.state.score > self.state.high_score:
-                    self.state.high_score = self.state.score
-                self.db.save_state(self.state)
+            if x < 0 or x >= width or y < 0 or y >= self.GRID_HEIGHT:
+                state.game_over = True
+                if state.score > state.high_score:
+                    state.high_score = state.score
+                self._publish_state()
+                self.db.save_state(state)
                 self._notify_observers()
                 return
 
             # Check collision with self
-            if new_head in self.state.snake:
-                self.state.game_over = True
-                if self.state.score > self.state.high_score:
-                    self.state.high_score = self.state.score
-                self.db.save_state(self.state)
+            cell = y * width + x
+            if grid[cell]:
+                state.game_over = True
+                if state.score > state.high_score:
+                    state.high_score = state.score
+                self._publish_state()
+                self.db.save_state(state)
                 self._notify_observers()
                 return
 
             # Add new head
-            self.state.snake.insert(0, new_head)
+            snake.appendleft(Position(x, y))
+            grid[cell] = 1
 
             # Check fruit collision
-            if new_head == self.state.fruit:
-                self.state.score += 10
-                self.state.fruit = self._generate_fruit()
+            fruit = state.fruit
+            if x == fruit.x and y == fruit.y:
+                state.score += 10
+                new_fruit = self._generate_fruit()
+                if new_fruit is None:
+                    # The snake fills the whole board, so the game ends here
+                    state.game_over = True
+                    if state.score > state.high_score:
+                        state.high_score = state.score
+                else:
+                    state.fruit = new_fruit
             else:
                 # Remove tail if didn't eat fruit
-                self.state.snake.pop()
+                tail = snake.pop()
+                grid[tail.y * width + tail.x] = 0
+
+            self._publish_state()
 
             # Save to database
-            self.db.save_state(self.state)
+            self.db.save_state(state)
 
             # Notify all observers
             self._notify_observers()
@@ -253,18 +376,20 @@ class SnakeGame:
         with self.lock:
             high_score = self.state.high_score
             self.state = GameState(
-                snake=[Position(10, 10), Position(9, 10), Position(8, 10)],
+                snake=deque([Position(10, 10), Position(9, 10), Position(8, 10)]),
                 fruit=Position(15, 15),
                 score=0,
                 game_over=False,
-                direction=Direction.RIGHT,
+                direction=DIR_RIGHT,
                 high_score=high_score,
             )
-            self.db.save_state(self.state)
+            self._sync_occupied()
+            self._publish_state()
+            self.db.save_state(self.state, flush=True)
             self._notify_observers()
 
     def get_state(self) -> GameState:
-        """Get current game state"""
+        """Get a mutable copy of the current game state"""
         with self.lock:
             return GameState(
                 snake=self.state.snake.copy(),
@@ -275,26 +400,38 @@ class SnakeGame:
                 high_score=self.state.high_score,
             )
 
-    @staticmethod
-    def _get_direction_vector(direction: Direction) -> tuple:
-        """Get (dx, dy) for a direction"""
-        vectors = {
-            Direction.UP: (0, -1),
-            Direction.DOWN: (0, 1),
-            Direction.LEFT: (-1, 0),
-            Direction.RIGHT: (1, 0),
-        }
-        return vectors[direction]
+    def get_state_snapshot(self) -> GameSnapshot:
+        """Get the current game state as a shared read-only snapshot (no copy)"""
+        return self._snapshot
 
-    @staticmethod
-    def _generate_fruit() -> Position:
-        """Generate a random fruit position"""
+    def get_state_json(self) -> bytes:
+        """Get current game state pre-serialized as JSON, shared by all readers"""
+        return self._state_payload[1]
+
+    def get_state_payload(self) -> Tuple[int, bytes]:
+        """Get (version, JSON) for the current game state"""
+        return self._state_payload
+
+    def _generate_fruit(self) -> Optional[Position]:
+        """Generate a random fruit position on a cell not covered by the snake.
+
+        Returns None when the snake covers every cell.
+        """
         import random
 
-        return Position(
-            random.randint(0, SnakeGame.GRID_WIDTH - 1),
-            random.randint(0, SnakeGame.GRID_HEIGHT - 1),
-        )
+        grid = self._grid
+        # Random probes almost always hit a free cell while the board is mostly empty
+        for _ in range(32):
+            cell = random.randrange(len(grid))
+            if not grid[cell]:
+                return Position(cell % self.GRID_WIDTH, cell // self.GRID_WIDTH)
+
+        # Crowded board: choose directly among the free cells
+        free_cells = [cell for cell, taken in enumerate(grid) if not taken]
+        if not free_cells:
+            return None
+        cell = random.choice(free_cells)
+        return Position(cell % self.GRID_WIDTH, cell // self.GRID_WIDTH)
 
 
 class GameSingleton:
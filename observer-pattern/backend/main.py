@@ -5,27 +5,35 @@ Demonstrates GOOD (WebSocket push) vs BAD (polling) patterns
 import asyncio
 import time
 import os
-from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, WebSocket, HTTPException, WebSocketDisconnect
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from typing import Optional
-import json
+import orjson
 
 from .game import GameSingleton, Direction, GameState
 
 # Get the path to frontend directory
 FRONTEND_DIR = os.path.join(os.path.dirname(__file__), "..", "frontend")
+INDEX_HTML = os.path.join(FRONTEND_DIR, "index.html")
+# Frontend files aren't content-hashed, so cache briefly and revalidate via ETag after
+STATIC_CACHE_CONTROL = "public, max-age=300"
 
 # Global game state
 game = None
 game_tick_task = None
+broadcaster_task = None
+event_loop: Optional[asyncio.AbstractEventLoop] = None  # Loop that owns broadcast_queue
+broadcast_queue: asyncio.Queue = asyncio.Queue()  # Serialized states waiting to be pushed
 active_player = None  # Track the active player connection ID
 player_lock = asyncio.Lock()
 game_speed = 0.5  # Game tick interval in seconds (lower = faster)
 use_push_updates = True  # Current mode: True = WebSocket (GOOD), False = Polling (BAD)
 game_started = False  # Whether the game is actively running (not paused)
 polling_delay = 0.1  # Artificial delay for polling endpoint in seconds
+etag_epoch = time.time_ns()  # Prevents ETags from an earlier server run matching
 
 
 async def game_tick_loop():
@@ -34,7 +42,11 @@ async def game_tick_loop():
     while True:
         try:
             if game and game_started and not game.state.game_over:
-                game.tick()
+                # Tick (and its DB write) runs in a worker thread to keep the loop free
+                await asyncio.to_thread(game.tick)
+            elif game and game.db.has_pending():
+                # Paused: no tick will trip the batch limits, so write buffered ticks now
+                await asyncio.to_thread(game.db.flush)
             await asyncio.sleep(game_speed)
         except Exception as e:
             print(f"Error in game tick: {e}")
@@ -44,19 +56,28 @@ async def game_tick_loop():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global game, game_tick_task
+    global game, game_tick_task, broadcaster_task, event_loop
     # Startup
+    event_loop = asyncio.get_running_loop()
     game = GameSingleton.get_instance("game.db")
+    game.subscribe(notify_spectators)
     game_tick_task = asyncio.create_task(game_tick_loop())
+    broadcaster_task = asyncio.create_task(broadcast_loop())
     print("Game initialized and tick loop started")
     yield
     # Shutdown
     if game_tick_task:
         game_tick_task.cancel()
+    if broadcaster_task:
+        broadcaster_task.cancel()
+    game.unsubscribe(notify_spectators)
+    # Persist any ticks still buffered by the database batcher
+    game.db.flush()
     print("Game shutdown")
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=500)
 
 # Store WebSocket connections for push updates
 spectator_connections: dict[int, WebSocket] = {}
@@ -64,15 +85,20 @@ connection_counter = 0
 
 
 @app.get("/api/state")
-async def get_state():
+async def get_state(request: Request):
     """Endpoint for polling spectators (BAD approach)"""
     global polling_delay
     if not game:
         return {"error": "Game not initialized"}
     # Artificial delay to simulate bad polling
     await asyncio.sleep(polling_delay)
-    state = game.get_state()
-    return state.to_dict()
+
+    # Unchanged since the client's last poll: skip the body entirely
+    version, state_json = game.get_state_payload()
+    headers = {"ETag": f'W/"{etag_epoch}-{version}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=state_json, media_type="application/json", headers=headers)
 
 
 @app.post("/api/player/connect")
@@ -194,20 +220,9 @@ async def websocket_spectate(websocket: WebSocket):
     connection_counter += 1
     spectator_connections[conn_id] = websocket
 
-    def notify_spectator(state: GameState):
-        """Callback for observer pattern - runs when game state changes"""
-        # This will be called from the game tick thread
-        asyncio.create_task(send_update_to_spectator(conn_id, state))
-
-    game.subscribe(notify_spectator)
-
     try:
         # Send initial state
-        state = game.get_state()
-        await websocket.send_json({
-            "type": "game_state",
-            "data": state.to_dict()
-        })
+        await websocket.send_text(game_state_message(game.get_state_json()))
 
         # Keep connection alive, listen for disconnection
         while True:
@@ -215,22 +230,46 @@ async def websocket_spectate(websocket: WebSocket):
     except WebSocketDisconnect:
         pass
     finally:
-        game.unsubscribe(notify_spectator)
         if conn_id in spectator_connections:
             del spectator_connections[conn_id]
 
 
-async def send_update_to_spectator(conn_id: int, state: GameState):
-    """Send update to a specific spectator"""
-    if conn_id in spectator_connections:
-        try:
-            await spectator_connections[conn_id].send_json({
-                "type": "game_state",
-                "data": state.to_dict(),
-                "timestamp": time.time()
-            })
-        except Exception as e:
-            print(f"Error sending to spectator {conn_id}: {e}")
+def game_state_message(state_json: bytes) -> str:
+    """Wrap pre-serialized game state in the spectator message envelope"""
+    return (
+        b'{"type":"game_state","data":' + state_json
+        + b',"timestamp":' + orjson.dumps(time.time()) + b"}"
+    ).decode()
+
+
+def notify_spectators(state: GameState):
+    """Callback for observer pattern - runs when game state changes"""
+    # One observer for all spectators; the broadcaster fans the update out.
+    # May be called from the tick worker thread, so hand off to the loop safely.
+    event_loop.call_soon_threadsafe(broadcast_queue.put_nowait, game.get_state_json())
+
+
+async def broadcast_loop():
+    """Background task that pushes each state update to every spectator"""
+    while True:
+        state_json = await broadcast_queue.get()
+        # If sends fell behind, skip straight to the newest state
+        while not broadcast_queue.empty():
+            state_json = broadcast_queue.get_nowait()
+
+        connections = list(spectator_connections.items())
+        if not connections:
+            continue
+
+        # Encode the envelope once; every spectator gets the same text frame
+        message = game_state_message(state_json)
+        results = await asyncio.gather(
+            *(ws.send_text(message) for _, ws in connections),
+            return_exceptions=True,
+        )
+        for (conn_id, _), result in zip(connections, results):
+            if isinstance(result, Exception):
+                print(f"Error sending to spectator {conn_id}: {result}")
 
 
 @app.get("/api/health")
@@ -242,17 +281,26 @@ async def health():
 @app.get("/")
 async def index():
     """Serve frontend"""
-    return FileResponse(os.path.join(FRONTEND_DIR, "index.html"))
+    return FileResponse(INDEX_HTML, headers={"Cache-Control": STATIC_CACHE_CONTROL})
 
 
 @app.get("/player")
 async def player():
     """Serve player frontend"""
-    return FileResponse(os.path.join(FRONTEND_DIR, "index.html"))
+    return FileResponse(INDEX_HTML, headers={"Cache-Control": STATIC_CACHE_CONTROL})
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that also tells browsers how long to cache each file"""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = STATIC_CACHE_CONTROL
+        return response
 
 
 # Serve static files from frontend
 try:
-    app.mount("/", StaticFiles(directory=FRONTEND_DIR, html=True), name="frontend")
+    app.mount("/", CachedStaticFiles(directory=FRONTEND_DIR, html=True), name="frontend")
 except Exception as e:
     print(f"Warning: Could not mount static files: {e}")
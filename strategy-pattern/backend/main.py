@@ -2,11 +2,19 @@
 FastAPI application for Strategy Pattern demonstration
 """
 
-from fastapi import FastAPI, HTTPException
+import os
+from enum import Enum
+from functools import lru_cache
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.responses import ORJSONResponse, Response
+import msgspec
+import orjson
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from typing import Annotated, Callable, List, Dict, Any, Optional, Tuple
 from payment_strategies import (
+    PaymentStrategy,
     ShoppingCart,
     BadShoppingCart,
     CreditCardPayment,
@@ -32,25 +40,38 @@ FAKE_DATA = {
         "wallet_address": "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
     }
 }
+FAKE_DATA_JSON = orjson.dumps(FAKE_DATA)
 
 app = FastAPI(
     title="Strategy Pattern Demo - Payment System",
     description="Demonstrates the Strategy Pattern with different payment methods",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify actual origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Configure CORS. The demo frontend runs on another port, so this is on by default;
+# set ENABLE_CORS_MIDDLEWARE=0 (or false/no/off) when a reverse proxy adds the CORS
+# headers instead. Any other value, including unset, keeps it enabled.
+if os.environ.get("ENABLE_CORS_MIDDLEWARE", "1").strip().lower() not in ("0", "false", "no", "off"):
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify actual origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
 # In-memory storage for demo purposes
-carts: Dict[str, ShoppingCart] = {}
-bad_carts: Dict[str, BadShoppingCart] = {}
+# Each cart_id maps to its ShoppingCart; idle carts expire after an hour,
+# and once MAX_CARTS is reached the least recently used cart is evicted first.
+# Handlers never await between reading and replacing an entry, so no lock is needed.
+CART_TTL_SECONDS = 3600
+MAX_CARTS = 10_000
+carts: TTLCache = TTLCache(maxsize=MAX_CARTS, ttl=CART_TTL_SECONDS)
+# cart_id -> (cart, cart.version, encoded summary); reused until the cart changes
+cart_summaries: TTLCache = TTLCache(maxsize=MAX_CARTS, ttl=CART_TTL_SECONDS)
+# Body for a cart_id with no cart yet
+EMPTY_CART_JSON = orjson.dumps({"items": [], "total": 0.0})
 available_payment_methods: Dict[str, Dict[str, Any]] = {
     "apple_pay": {"name": "Apple Pay", "icon": "🍎", "account_field": "email"},
     "google_pay": {"name": "Google Pay", "icon": "🔵", "account_field": "email"},
@@ -58,10 +79,14 @@ available_payment_methods: Dict[str, Dict[str, Any]] = {
     "square": {"name": "Square", "icon": "⬜", "account_field": "seller_id"},
 }
 registered_payment_methods: Dict[str, str] = {}  # Dynamically added methods
+# Constant informational responses only change on redeploy, so let browsers cache them
+INFO_CACHE_HEADERS = {"Cache-Control": "public, max-age=3600"}
 
 
-# Pydantic models for request/response
+# Pydantic model for response data
 class Product(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int
     name: str
     price: float
@@ -69,72 +94,136 @@ class Product(BaseModel):
     image: str
 
 
-class CartItem(BaseModel):
+class PaymentMethod(str, Enum):
+    """Built-in payment methods; members compare and hash like their string values"""
+    CREDIT_CARD = "credit_card"
+    PAYPAL = "paypal"
+    BITCOIN = "bitcoin"
+
+
+# msgspec structs for request bodies (decoded by msgspec_body, bypassing Pydantic)
+# ShoppingCart keeps quantities in a signed 64-bit array
+Quantity = Annotated[int, msgspec.Meta(ge=-(2**63), le=2**63 - 1)]
+
+
+class CartItem(msgspec.Struct):
     name: str
     price: float
-    quantity: int = 1
+    quantity: Quantity = 1
 
 
-class CreditCardDetails(BaseModel):
+class CreditCardDetails(msgspec.Struct):
     card_number: str
     card_holder: str
     cvv: str
     expiry: str
 
 
-class PayPalDetails(BaseModel):
+class PayPalDetails(msgspec.Struct):
     email: str
     password: str
 
 
-class BitcoinDetails(BaseModel):
+class BitcoinDetails(msgspec.Struct):
     wallet_address: str
 
 
-class PaymentRequest(BaseModel):
+class PaymentRequest(msgspec.Struct):
     cart_id: str
-    payment_method: str
+    payment_method: str  # A PaymentMethod value or a method registered at runtime
     credit_card: Optional[CreditCardDetails] = None
     paypal: Optional[PayPalDetails] = None
     bitcoin: Optional[BitcoinDetails] = None
     use_bad_example: bool = False
 
 
-# Sample products
+def msgspec_body(struct_type):
+    """Build a dependency that decodes and validates the JSON body as struct_type"""
+    # strict=False accepts numeric strings etc., matching Pydantic's lax coercion
+    decoder = msgspec.json.Decoder(struct_type, strict=False)
+
+    async def decode(request: Request):
+        try:
+            return decoder.decode(await request.body())
+        except msgspec.DecodeError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    return decode
+
+
+# Component schemas referenced by msgspec_openapi request bodies, merged in by openapi()
+msgspec_components: Dict[str, Any] = {}
+
+
+def msgspec_openapi(struct_type) -> Dict[str, Any]:
+    """Build openapi_extra documenting a msgspec_body request body, so /docs can send it"""
+    (schema,), components = msgspec.json.schema_components(
+        [struct_type], ref_template="#/components/schemas/{name}"
+    )
+    msgspec_components.update(components)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}}
+        }
+    }
+
+
+def openapi() -> Dict[str, Any]:
+    """FastAPI's generated OpenAPI schema plus the msgspec component schemas"""
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(msgspec_components)
+    return app.openapi_schema
+
+
+app.openapi = openapi
+
+
+# Sample products (our own data, so skip validation)
 PRODUCTS = [
-    Product(id=1, name="Laptop", price=999.99, description="High-performance laptop", image="💻"),
-    Product(id=2, name="Smartphone", price=699.99, description="Latest smartphone", image="📱"),
-    Product(id=3, name="Headphones", price=199.99, description="Noise-canceling headphones", image="🎧"),
-    Product(id=4, name="Tablet", price=499.99, description="10-inch tablet", image="📱"),
-    Product(id=5, name="Smartwatch", price=299.99, description="Fitness tracking smartwatch", image="⌚"),
-    Product(id=6, name="Camera", price=799.99, description="Digital camera", image="📷"),
+    Product.model_construct(id=1, name="Laptop", price=999.99, description="High-performance laptop", image="💻"),
+    Product.model_construct(id=2, name="Smartphone", price=699.99, description="Latest smartphone", image="📱"),
+    Product.model_construct(id=3, name="Headphones", price=199.99, description="Noise-canceling headphones", image="🎧"),
+    Product.model_construct(id=4, name="Tablet", price=499.99, description="10-inch tablet", image="📱"),
+    Product.model_construct(id=5, name="Smartwatch", price=299.99, description="Fitness tracking smartwatch", image="⌚"),
+    Product.model_construct(id=6, name="Camera", price=799.99, description="Digital camera", image="📷"),
 ]
+# Static, so serialize once at import and serve the bytes directly
+PRODUCTS_JSON = TypeAdapter(List[Product]).dump_json(PRODUCTS)
+
+
+API_INFO = {
+    "message": "Strategy Pattern Demo API",
+    "description": "This API demonstrates the Strategy Pattern using different payment methods",
+    "endpoints": {
+        "products": "/products - Get available products",
+        "cart": "/cart/{cart_id} - Manage shopping cart",
+        "checkout": "/checkout - Process payment using Strategy Pattern"
+    }
+}
+API_INFO_JSON = orjson.dumps(API_INFO)
 
 
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "Strategy Pattern Demo API",
-        "description": "This API demonstrates the Strategy Pattern using different payment methods",
-        "endpoints": {
-            "products": "/products - Get available products",
-            "cart": "/cart/{cart_id} - Manage shopping cart",
-            "checkout": "/checkout - Process payment using Strategy Pattern"
-        }
-    }
+    return Response(API_INFO_JSON, media_type="application/json", headers=INFO_CACHE_HEADERS)
 
 
-@app.get("/products", response_model=List[Product])
+# Documented via responses= rather than response_model=, which would re-validate every item
+@app.get("/products", responses={200: {"model": List[Product]}})
 async def get_products():
     """Get list of available products"""
-    return PRODUCTS
+    return Response(PRODUCTS_JSON, media_type="application/json")
 
 
-@app.get("/available-payment-methods")
-async def get_available_payment_methods():
-    """Get list of available payment methods that can be added"""
-    return {
+# Keyed on the registered methods, so a registration misses and replaces the one entry
+@lru_cache(maxsize=1)
+def build_available_methods(registered: Tuple[Tuple[str, str], ...]) -> bytes:
+    """Encode the /available-payment-methods body for the given registered methods"""
+    registered_ids = dict(registered)
+    return orjson.dumps({
         "available": [
             {
                 "id": method_id,
@@ -143,31 +232,41 @@ async def get_available_payment_methods():
                 "account_field": details["account_field"]
             }
             for method_id, details in available_payment_methods.items()
-            if method_id not in registered_payment_methods
+            if method_id not in registered_ids
         ],
         "registered": [
             {
                 "id": method_id,
                 "name": method_name
             }
-            for method_id, method_name in registered_payment_methods.items()
+            for method_id, method_name in registered
         ]
-    }
+    })
+
+
+@app.get("/available-payment-methods")
+async def get_available_payment_methods():
+    """Get list of available payment methods that can be added"""
+    # A tuple rather than a frozenset so the registration order is part of the key
+    body = build_available_methods(tuple(registered_payment_methods.items()))
+    return Response(body, media_type="application/json")
 
 
 @app.get("/fake-data")
 async def get_fake_data():
     """Get pre-filled fake data for testing (to save time)"""
-    return FAKE_DATA
+    return Response(FAKE_DATA_JSON, media_type="application/json")
 
 
-class AddPaymentMethodRequest(BaseModel):
+class AddPaymentMethodRequest(msgspec.Struct):
     method_id: str
     use_bad_example: bool = False
 
 
-@app.post("/add-payment-method")
-async def add_payment_method(request: AddPaymentMethodRequest):
+@app.post("/add-payment-method", openapi_extra=msgspec_openapi(AddPaymentMethodRequest))
+async def add_payment_method(
+    request: AddPaymentMethodRequest = Depends(msgspec_body(AddPaymentMethodRequest))
+):
     """
     Add a new payment method dynamically.
 
@@ -203,6 +302,7 @@ async def add_payment_method(request: AddPaymentMethodRequest):
     else:
         # GOOD example: Can add dynamically with Strategy Pattern
         registered_payment_methods[request.method_id] = method_details["name"]
+        STRATEGY_FACTORIES[request.method_id] = dynamic_strategy(request.method_id)
         return {
             "success": True,
             "message": f"Successfully added {method_details['name']}!",
@@ -218,37 +318,66 @@ async def add_payment_method(request: AddPaymentMethodRequest):
         }
 
 
-@app.post("/cart/{cart_id}/add")
-async def add_to_cart(cart_id: str, item: CartItem):
+@app.post("/cart/{cart_id}/add", openapi_extra=msgspec_openapi(CartItem))
+async def add_to_cart(cart_id: str, item: CartItem = Depends(msgspec_body(CartItem))):
     """Add item to cart"""
-    if cart_id not in carts:
-        carts[cart_id] = ShoppingCart()
-        bad_carts[cart_id] = BadShoppingCart()
+    cart = carts.get(cart_id)
+    if cart is None:
+        cart = ShoppingCart()
+    # Re-inserting refreshes the TTL so active carts don't expire
+    carts[cart_id] = cart
 
-    carts[cart_id].add_item(item.name, item.price, item.quantity)
-    bad_carts[cart_id].add_item(item.name, item.price, item.quantity)
+    cart.add_item(item.name, item.price, item.quantity)
 
     return {
         "success": True,
         "message": f"Added {item.name} to cart",
-        "total": carts[cart_id].get_total()
+        "total": cart.get_total()
+    }
+
+
+@app.post("/cart/{cart_id}/add-batch", openapi_extra=msgspec_openapi(List[CartItem]))
+async def add_batch_to_cart(
+    cart_id: str, items: List[CartItem] = Depends(msgspec_body(List[CartItem]))
+):
+    """Add several items to cart in one request"""
+    cart = carts.get(cart_id)
+    if cart is None:
+        cart = ShoppingCart()
+    carts[cart_id] = cart
+
+    for item in items:
+        cart.add_item(item.name, item.price, item.quantity)
+
+    return {
+        "success": True,
+        "message": f"Added {len(items)} items to cart",
+        "total": cart.get_total()
     }
 
 
 @app.get("/cart/{cart_id}")
 async def get_cart(cart_id: str):
     """Get cart contents"""
-    if cart_id not in carts:
-        return {
-            "items": [],
-            "total": 0.0
-        }
+    cart = carts.get(cart_id)
+    if cart is None:
+        return Response(EMPTY_CART_JSON, media_type="application/json")
 
-    cart = carts[cart_id]
-    return {
+    return Response(cart_summary_json(cart_id, cart), media_type="application/json")
+
+
+def cart_summary_json(cart_id: str, cart: ShoppingCart) -> bytes:
+    """Encode a cart's items and total, reusing the last encoding if unchanged"""
+    cached = cart_summaries.get(cart_id)
+    if cached is not None and cached[0] is cart and cached[1] == cart.version:
+        return cached[2]
+
+    summary = orjson.dumps({
         "items": cart.items,
         "total": cart.get_total()
-    }
+    })
+    cart_summaries[cart_id] = (cart, cart.version, summary)
+    return summary
 
 
 @app.delete("/cart/{cart_id}")
@@ -256,45 +385,90 @@ async def clear_cart(cart_id: str):
     """Clear cart"""
     if cart_id in carts:
         carts[cart_id] = ShoppingCart()
-        bad_carts[cart_id] = BadShoppingCart()
+        # The old summary can never match the new cart, so free it now
+        cart_summaries.pop(cart_id, None)
 
     return {"success": True, "message": "Cart cleared"}
 
 
-@app.post("/checkout")
-async def checkout(payment_request: PaymentRequest):
+def credit_card_strategy(payment_request: PaymentRequest) -> PaymentStrategy:
+    card = payment_request.credit_card
+    if not card:
+        raise HTTPException(status_code=400, detail="Credit card details required")
+    return CreditCardPayment(
+        card_number=card.card_number,
+        card_holder=card.card_holder,
+        cvv=card.cvv,
+        expiry=card.expiry
+    )
+
+
+def paypal_strategy(payment_request: PaymentRequest) -> PaymentStrategy:
+    paypal = payment_request.paypal
+    if not paypal:
+        raise HTTPException(status_code=400, detail="PayPal details required")
+    return PayPalPayment(
+        email=paypal.email,
+        password=paypal.password
+    )
+
+
+def bitcoin_strategy(payment_request: PaymentRequest) -> PaymentStrategy:
+    bitcoin = payment_request.bitcoin
+    if not bitcoin:
+        raise HTTPException(status_code=400, detail="Bitcoin details required")
+    return BitcoinPayment(
+        wallet_address=bitcoin.wallet_address
+    )
+
+
+def dynamic_strategy(method_id: str) -> Callable[[PaymentRequest], PaymentStrategy]:
+    """Build the factory for a payment method registered at runtime"""
+    def factory(payment_request: PaymentRequest) -> PaymentStrategy:
+        return DynamicPaymentStrategy(
+            method_name=method_id,
+            account_identifier="dynamic-account-" + method_id
+        )
+
+    return factory
+
+
+# payment_method -> factory building its strategy; add_payment_method extends this at runtime
+STRATEGY_FACTORIES: Dict[str, Callable[[PaymentRequest], PaymentStrategy]] = {
+    PaymentMethod.CREDIT_CARD: credit_card_strategy,
+    PaymentMethod.PAYPAL: paypal_strategy,
+    PaymentMethod.BITCOIN: bitcoin_strategy,
+}
+
+
+@app.post("/checkout", openapi_extra=msgspec_openapi(PaymentRequest))
+async def checkout(payment_request: PaymentRequest = Depends(msgspec_body(PaymentRequest))):
     """
     Process checkout using Strategy Pattern (GOOD example) or
     without it (BAD example) based on use_bad_example flag
     """
     cart_id = payment_request.cart_id
 
-    if cart_id not in carts:
+    cart = carts.get(cart_id)
+    if cart is None:
         raise HTTPException(status_code=404, detail="Cart not found")
 
     # BAD EXAMPLE: Without Strategy Pattern
     if payment_request.use_bad_example:
-        bad_cart = bad_carts[cart_id]
+        payment_method = payment_request.payment_method
         payment_details = {}
 
-        if payment_request.payment_method == "credit_card" and payment_request.credit_card:
-            payment_details = {
-                "card_number": payment_request.credit_card.card_number,
-                "card_holder": payment_request.credit_card.card_holder,
-                "cvv": payment_request.credit_card.cvv,
-                "expiry": payment_request.credit_card.expiry
-            }
-        elif payment_request.payment_method == "paypal" and payment_request.paypal:
-            payment_details = {
-                "email": payment_request.paypal.email,
-                "password": payment_request.paypal.password
-            }
-        elif payment_request.payment_method == "bitcoin" and payment_request.bitcoin:
-            payment_details = {
-                "wallet_address": payment_request.bitcoin.wallet_address
-            }
-
-        result = bad_cart.checkout(payment_request.payment_method, payment_details)
+        # asdict copies the struct's fields into a dict in one call
+        if payment_method == PaymentMethod.CREDIT_CARD and payment_request.credit_card:
+            payment_details = msgspec.structs.asdict(payment_request.credit_card)
+        elif payment_method == PaymentMethod.PAYPAL and payment_request.paypal:
+            payment_details = msgspec.structs.asdict(payment_request.paypal)
+        elif payment_method == PaymentMethod.BITCOIN and payment_request.bitcoin:
+            payment_details = msgspec.structs.asdict(payment_request.bitcoin)
+
+        # Only built when the BAD example is actually requested
+        bad_cart = BadShoppingCart.from_cart(cart)
+        result = bad_cart.checkout(payment_method, payment_details)
         result["pattern_used"] = "BAD - Without Strategy Pattern"
         result["problems"] = [
             "All payment logic in one method",
@@ -302,42 +476,14 @@ async def checkout(payment_request: PaymentRequest):
             "Violates Open/Closed Principle",
             "Difficult to test individual payment methods"
         ]
-        return result
+        return ORJSONResponse(result)
 
     # GOOD EXAMPLE: With Strategy Pattern
-    cart = carts[cart_id]
-
     # Select payment strategy based on request
-    if payment_request.payment_method == "credit_card":
-        if not payment_request.credit_card:
-            raise HTTPException(status_code=400, detail="Credit card details required")
-        strategy = CreditCardPayment(
-            card_number=payment_request.credit_card.card_number,
-            card_holder=payment_request.credit_card.card_holder,
-            cvv=payment_request.credit_card.cvv,
-            expiry=payment_request.credit_card.expiry
-        )
-    elif payment_request.payment_method == "paypal":
-        if not payment_request.paypal:
-            raise HTTPException(status_code=400, detail="PayPal details required")
-        strategy = PayPalPayment(
-            email=payment_request.paypal.email,
-            password=payment_request.paypal.password
-        )
-    elif payment_request.payment_method == "bitcoin":
-        if not payment_request.bitcoin:
-            raise HTTPException(status_code=400, detail="Bitcoin details required")
-        strategy = BitcoinPayment(
-            wallet_address=payment_request.bitcoin.wallet_address
-        )
-    elif payment_request.payment_method in registered_payment_methods:
-        # Handle dynamically registered payment methods
-        strategy = DynamicPaymentStrategy(
-            method_name=payment_request.payment_method,
-            account_identifier="dynamic-account-" + payment_request.payment_method
-        )
-    else:
+    factory = STRATEGY_FACTORIES.get(payment_request.payment_method)
+    if factory is None:
         raise HTTPException(status_code=400, detail=f"Unknown payment method: {payment_request.payment_method}")
+    strategy = factory(payment_request)
 
     # Set strategy and checkout
     cart.set_payment_strategy(strategy)
@@ -351,42 +497,46 @@ async def checkout(payment_request: PaymentRequest):
         "Easy to test individual payment strategies"
     ]
 
-    return result
+    return ORJSONResponse(result)
+
+
+PATTERN_INFO = {
+    "name": "Strategy Pattern",
+    "category": "Behavioral Pattern",
+    "intent": "Define a family of algorithms, encapsulate each one, and make them interchangeable. Strategy lets the algorithm vary independently from clients that use it.",
+    "structure": {
+        "Strategy": "Common interface for all supported algorithms",
+        "ConcreteStrategy": "Implements the algorithm using the Strategy interface",
+        "Context": "Uses a Strategy object to execute the algorithm"
+    },
+    "pros": [
+        "Open/Closed Principle - You can introduce new strategies without changing context",
+        "Single Responsibility Principle - Isolate algorithm implementation from code that uses it",
+        "Replace inheritance with composition",
+        "Runtime flexibility - Switch algorithms at runtime"
+    ],
+    "cons": [
+        "Clients must be aware of different strategies",
+        "Increases number of objects in the application",
+        "Modern languages may use functional programming features instead"
+    ],
+    "example": {
+        "context": "ShoppingCart",
+        "strategies": [
+            "CreditCardPayment",
+            "PayPalPayment",
+            "BitcoinPayment"
+        ],
+        "use_case": "Different payment methods that can be selected at checkout"
+    }
+}
+PATTERN_INFO_JSON = orjson.dumps(PATTERN_INFO)
 
 
 @app.get("/pattern-info")
 async def pattern_info():
     """Get information about the Strategy Pattern"""
-    return {
-        "name": "Strategy Pattern",
-        "category": "Behavioral Pattern",
-        "intent": "Define a family of algorithms, encapsulate each one, and make them interchangeable. Strategy lets the algorithm vary independently from clients that use it.",
-        "structure": {
-            "Strategy": "Common interface for all supported algorithms",
-            "ConcreteStrategy": "Implements the algorithm using the Strategy interface",
-            "Context": "Uses a Strategy object to execute the algorithm"
-        },
-        "pros": [
-            "Open/Closed Principle - You can introduce new strategies without changing context",
-            "Single Responsibility Principle - Isolate algorithm implementation from code that uses it",
-            "Replace inheritance with composition",
-            "Runtime flexibility - Switch algorithms at runtime"
-        ],
-        "cons": [
-            "Clients must be aware of different strategies",
-            "Increases number of objects in the application",
-            "Modern languages may use functional programming features instead"
-        ],
-        "example": {
-            "context": "ShoppingCart",
-            "strategies": [
-                "CreditCardPayment",
-                "PayPalPayment",
-                "BitcoinPayment"
-            ],
-            "use_case": "Different payment methods that can be selected at checkout"
-        }
-    }
+    return Response(PATTERN_INFO_JSON, media_type="application/json", headers=INFO_CACHE_HEADERS)
 
 
 if __name__ == "__main__":
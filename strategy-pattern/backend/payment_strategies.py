@@ -7,13 +7,24 @@ and makes them interchangeable.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from array import array
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
+import time
+
+
+def _now() -> Tuple[float, str]:
+    """Read the clock once; returns (epoch seconds, local ISO-8601 timestamp)"""
+    ts = time.time()
+    return ts, datetime.fromtimestamp(ts).isoformat()
 
 
 class PaymentStrategy(ABC):
     """Abstract base class for payment strategies (The Strategy Interface)"""
 
+    # Empty so concrete strategies with __slots__ stay free of a per-instance __dict__
+    __slots__ = ()
+
     @abstractmethod
     def pay(self, amount: float) -> Dict[str, Any]:
         """Process payment and return result"""
@@ -28,45 +39,52 @@ class PaymentStrategy(ABC):
 class CreditCardPayment(PaymentStrategy):
     """Concrete Strategy: Credit Card Payment"""
 
+    __slots__ = ("card_number", "card_holder", "cvv", "expiry", "_last4", "_masked")
+
     def __init__(self, card_number: str, card_holder: str, cvv: str, expiry: str):
         self.card_number = card_number
         self.card_holder = card_holder
         self.cvv = cvv
         self.expiry = expiry
+        # The card number never changes, so mask it once up front
+        self._last4 = card_number[-4:]
+        self._masked = f"****-****-****-{self._last4}"
 
     def pay(self, amount: float) -> Dict[str, Any]:
         # Simulate payment processing
-        masked_card = f"****-****-****-{self.card_number[-4:]}"
+        ts, timestamp = _now()
         return {
             "success": True,
             "method": "Credit Card",
             "amount": amount,
-            "transaction_id": f"CC-{datetime.now().timestamp()}",
-            "details": f"Charged {masked_card}",
-            "timestamp": datetime.now().isoformat()
+            "transaction_id": f"CC-{ts}",
+            "details": f"Charged {self._masked}",
+            "timestamp": timestamp
         }
 
     def get_payment_details(self) -> str:
-        masked_card = f"****-****-****-{self.card_number[-4:]}"
-        return f"Credit Card ending in {self.card_number[-4:]}"
+        return f"Credit Card ending in {self._last4}"
 
 
 class PayPalPayment(PaymentStrategy):
     """Concrete Strategy: PayPal Payment"""
 
+    __slots__ = ("email", "password")
+
     def __init__(self, email: str, password: str):
         self.email = email
         self.password = password
 
     def pay(self, amount: float) -> Dict[str, Any]:
         # Simulate PayPal payment processing
+        ts, timestamp = _now()
         return {
             "success": True,
             "method": "PayPal",
             "amount": amount,
-            "transaction_id": f"PP-{datetime.now().timestamp()}",
+            "transaction_id": f"PP-{ts}",
             "details": f"Charged PayPal account {self.email}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
 
     def get_payment_details(self) -> str:
@@ -76,20 +94,23 @@ class PayPalPayment(PaymentStrategy):
 class BitcoinPayment(PaymentStrategy):
     """Concrete Strategy: Bitcoin Payment"""
 
+    __slots__ = ("wallet_address",)
+
     def __init__(self, wallet_address: str):
         self.wallet_address = wallet_address
 
     def pay(self, amount: float) -> Dict[str, Any]:
         # Simulate Bitcoin payment processing
         btc_amount = amount / 45000  # Fake conversion rate
+        ts, timestamp = _now()
         return {
             "success": True,
             "method": "Bitcoin",
             "amount": amount,
             "btc_amount": round(btc_amount, 8),
-            "transaction_id": f"BTC-{datetime.now().timestamp()}",
+            "transaction_id": f"BTC-{ts}",
             "details": f"Transferred {btc_amount:.8f} BTC to {self.wallet_address[:8]}...",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
 
     def get_payment_details(self) -> str:
@@ -99,18 +120,21 @@ class BitcoinPayment(PaymentStrategy):
 class DynamicPaymentStrategy(PaymentStrategy):
     """Concrete Strategy: A dynamically added payment method (shows Strategy Pattern flexibility)"""
 
+    __slots__ = ("method_name", "account_identifier")
+
     def __init__(self, method_name: str, account_identifier: str):
         self.method_name = method_name
         self.account_identifier = account_identifier
 
     def pay(self, amount: float) -> Dict[str, Any]:
+        ts, timestamp = _now()
         return {
             "success": True,
             "method": self.method_name,
             "amount": amount,
-            "transaction_id": f"{self.method_name[:3].upper()}-{datetime.now().timestamp()}",
+            "transaction_id": f"{self.method_name[:3].upper()}-{ts}",
             "details": f"Charged {self.method_name} account {self.account_identifier}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
 
     def get_payment_details(self) -> str:
@@ -120,21 +144,36 @@ class DynamicPaymentStrategy(PaymentStrategy):
 class ShoppingCart:
     """Context class that uses a PaymentStrategy"""
 
+    __slots__ = ("_names", "_prices", "_quantities", "payment_strategy", "_total", "version")
+
     def __init__(self):
-        self.items = []
+        # Items are stored column-wise; dicts are only built when items are read
+        self._names: List[str] = []
+        self._prices = array("d")
+        self._quantities = array("q")
         self.payment_strategy: PaymentStrategy = None
+        self._total = 0.0  # Running total, kept in step with items
+        self.version = 0  # Bumped on every change so callers can cache views of the cart
+
+    @property
+    def items(self) -> List[Dict[str, Any]]:
+        """Cart items as a list of {"name", "price", "quantity"} dicts"""
+        return [
+            {"name": name, "price": price, "quantity": quantity}
+            for name, price, quantity in zip(self._names, self._prices, self._quantities)
+        ]
 
     def add_item(self, name: str, price: float, quantity: int = 1):
         """Add item to cart"""
-        self.items.append({
-            "name": name,
-            "price": price,
-            "quantity": quantity
-        })
+        self._names.append(name)
+        self._prices.append(price)
+        self._quantities.append(quantity)
+        self._total += price * quantity
+        self.version += 1
 
     def get_total(self) -> float:
-        """Calculate total price"""
-        return sum(item["price"] * item["quantity"] for item in self.items)
+        """Get total price"""
+        return self._total
 
     def set_payment_strategy(self, strategy: PaymentStrategy):
         """Set the payment strategy (Strategy Pattern in action!)"""
@@ -148,7 +187,7 @@ class ShoppingCart:
                 "error": "No payment method selected"
             }
 
-        if not self.items:
+        if not self._names:
             return {
                 "success": False,
                 "error": "Cart is empty"
@@ -176,14 +215,26 @@ class BadShoppingCart:
     4. Large, complex conditional logic
     """
 
+    __slots__ = ("items", "_total")
+
     def __init__(self):
         self.items = []
+        self._total = 0.0
+
+    @classmethod
+    def from_cart(cls, cart: ShoppingCart) -> "BadShoppingCart":
+        """Copy the contents of a ShoppingCart"""
+        bad_cart = cls()
+        bad_cart.items = cart.items
+        bad_cart._total = cart.get_total()
+        return bad_cart
 
     def add_item(self, name: str, price: float, quantity: int = 1):
         self.items.append({"name": name, "price": price, "quantity": quantity})
+        self._total += price * quantity
 
     def get_total(self) -> float:
-        return sum(item["price"] * item["quantity"] for item in self.items)
+        return self._total
 
     def checkout(self, payment_type: str, payment_details: Dict[str, str]) -> Dict[str, Any]:
         """
@@ -194,6 +245,7 @@ class BadShoppingCart:
             return {"success": False, "error": "Cart is empty"}
 
         total = self.get_total()
+        ts, timestamp = _now()
 
         # BAD: Large conditional block for each payment type
         if payment_type == "credit_card":
@@ -203,9 +255,9 @@ class BadShoppingCart:
                 "success": True,
                 "method": "Credit Card",
                 "amount": total,
-                "transaction_id": f"CC-{datetime.now().timestamp()}",
+                "transaction_id": f"CC-{ts}",
                 "details": f"Charged {masked_card}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             }
         elif payment_type == "paypal":
             email = payment_details.get("email", "")
@@ -213,9 +265,9 @@ class BadShoppingCart:
                 "success": True,
                 "method": "PayPal",
                 "amount": total,
-                "transaction_id": f"PP-{datetime.now().timestamp()}",
+                "transaction_id": f"PP-{ts}",
                 "details": f"Charged PayPal account {email}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             }
         elif payment_type == "bitcoin":
             wallet = payment_details.get("wallet_address", "")
@@ -225,9 +277,9 @@ class BadShoppingCart:
                 "method": "Bitcoin",
                 "amount": total,
                 "btc_amount": round(btc_amount, 8),
-                "transaction_id": f"BTC-{datetime.now().timestamp()}",
+                "transaction_id": f"BTC-{ts}",
                 "details": f"Transferred {btc_amount:.8f} BTC",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             }
         else:
             return {"success": False, "error": f"Unknown payment type: {payment_type}"}